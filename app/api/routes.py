@@ -2,24 +2,163 @@
 API Routes for Document Q&A System
 """
 
+from cachetools import LRUCache, TTLCache
 from fastapi import APIRouter, UploadFile, File, HTTPException, Body
-import json
+from fastapi.responses import StreamingResponse
+import asyncio
+import bisect
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional
 from uuid import uuid4
-from app.storage.manager import save_upload, delete_file
-from app.services.parser import extract_text_from_pdf, extract_text_from_docx, extract_text_from_txt
+from app.storage.manager import (
+    save_upload, delete_file, append_meta, append_meta_many, remove_meta,
+    clear_meta, clear_uploads
+)
+from app.services.parser import extract_text
 from app.services.vector_store import document_store
-from app.services.llm_service import create_qa_chain, format_context
+from app.services.llm_service import get_qa_chain, format_context
 from app.models.schemas import (
-    UploadResponse, AnswerRequest, AnswerResponse, SourceDocument,
-    TextInputRequest, TextInputResponse, DocumentListResponse,
-    DocumentMeta, ConfigResponse
+    UploadResponse, BatchUploadResponse, AnswerRequest, AnswerResponse,
+    SourceDocument, TextInputRequest, TextInputResponse, DocumentListResponse,
+    DocumentMeta, ConfigResponse, HighlightSpan
 )
-from app.core.config import settings, DATA_DIR
+from app.core.config import settings
+
+# Optional: true single-pass multi-pattern matching for highlights
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
 
 router = APIRouter()
 
-# In-memory document metadata
+
+@dataclass(slots=True)
+class DocEntry:
+    """In-memory registry entry for an ingested document."""
+    filename: str
+    filepath: Optional[Path]
+    chunks: int
+    file_type: str
+
+
+# In-memory document metadata. Reads are lock-free (dict reads are atomic);
+# structural writes paired with index appends hold the lock so concurrent
+# uploads and deletes cannot interleave half-registered documents.
 _doc_meta = {}
+_doc_meta_lock = asyncio.Lock()
+
+# Cached answers for repeated identical requests, cleared on any document
+# mutation so stale results are never served
+_answer_cache = TTLCache(maxsize=256, ttl=300)
+
+
+def _answer_cache_key(req: AnswerRequest) -> tuple:
+    doc_ids = tuple(sorted(req.doc_ids)) if req.doc_ids else None
+    return (req.query, doc_ids, req.top_k)
+
+
+# Lowercased chunk text reused across queries. Keys are (doc_id, chunk_index)
+# and doc_ids are fresh UUIDs, so entries can never go stale — LRU eviction
+# alone bounds memory.
+_lower_cache = LRUCache(maxsize=2048)
+
+
+def _lowered_text(doc) -> str:
+    """Get the lowercased text of a retrieved chunk, lowering at most once."""
+    metadata = doc.metadata
+    key = (metadata.get("doc_id"), metadata.get("chunk_index"))
+    text = _lower_cache.get(key)
+    if text is None:
+        text = _lower_cache[key] = doc.page_content.lower()
+    return text
+
+# Minimum query-term length considered for highlighting
+MIN_HIGHLIGHT_TERM_LEN = 3
+
+# Relevance-score boundaries for confidence labels (branchless bisect
+# lookup). Scores are the normalized relevance values DocumentStore.search
+# returns — higher is better, roughly 0-1 — NOT raw Chroma distances.
+_CONF_BOUNDS = (0.2, 0.5)
+_CONF_LABELS = ("low", "medium", "high")
+
+
+def _confidence_label(score: float) -> str:
+    """Map a normalized relevance score (higher = better) to a confidence label."""
+    return _CONF_LABELS[bisect.bisect_right(_CONF_BOUNDS, score)]
+
+
+# Document parsing is largely pure Python and therefore GIL-bound, so
+# concurrent uploads only scale across cores in separate processes. The
+# pool is created lazily so deployments that never ingest spawn nothing.
+_ingest_pool = None
+
+
+def _get_ingest_pool() -> ProcessPoolExecutor:
+    global _ingest_pool
+    if _ingest_pool is None:
+        _ingest_pool = ProcessPoolExecutor(max_workers=settings.INGEST_WORKERS)
+    return _ingest_pool
+
+
+async def _parse_upload(dest) -> str:
+    """Parse a saved upload in the ingest worker pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_ingest_pool(), extract_text, dest)
+
+
+@lru_cache(maxsize=256)
+def _compile_query_matcher(query: str):
+    """
+    Build the per-query term matcher.
+
+    Uses an Aho-Corasick automaton when pyahocorasick is installed — a true
+    linear single-pass scan over all terms — and falls back to one combined
+    alternation regex otherwise. Returns None if no term is long enough.
+    """
+    terms = {
+        t for t in query.lower().split()
+        if len(t) >= MIN_HIGHLIGHT_TERM_LEN
+    }
+    if not terms:
+        return None
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for term in terms:
+            automaton.add_word(term, len(term))
+        automaton.make_automaton()
+        return automaton
+    # Longest terms first so alternation prefers the widest match at
+    # any position, and duplicates never scan twice
+    return re.compile("|".join(re.escape(t) for t in sorted(terms, key=len, reverse=True)))
+
+
+def find_query_highlights(text_lower: str, matcher) -> List[HighlightSpan]:
+    """
+    Find query-term matches in pre-lowered chunk text.
+
+    Runs a single pass of the matcher and merges overlapping spans in
+    position order.
+    """
+    if ahocorasick is not None and isinstance(matcher, ahocorasick.Automaton):
+        # Automaton matches arrive end-ordered; sort by start for the merge
+        matches = sorted((end - length + 1, end + 1) for end, length in matcher.iter(text_lower))
+    else:
+        matches = (m.span() for m in matcher.finditer(text_lower))
+
+    # Merge over plain int pairs; spans are only materialized once final
+    merged = []
+    for start, end in matches:
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [HighlightSpan.model_construct(start=s, end=e) for s, e in merged]
 
 
 @router.get("/config", response_model=ConfigResponse)
@@ -37,41 +176,34 @@ async def get_config():
 async def upload_file(file: UploadFile = File(...)):
     """Upload a document (PDF, DOCX, TXT) to the knowledge base."""
     try:
-        doc_id, dest = save_upload(file)
+        doc_id, dest = await save_upload(file)
         ext = dest.suffix.lower()
         
-        # Extract text based on file type
-        if ext == ".pdf":
-            text = extract_text_from_pdf(dest)
-        elif ext == ".docx":
-            text = extract_text_from_docx(dest)
-        else:
-            text = extract_text_from_txt(dest)
+        # Extract text based on file type (parsing is blocking and CPU-bound,
+        # so run it in the ingest worker pool)
+        text = await _parse_upload(dest)
 
         if not text.strip():
             delete_file(dest)
             raise HTTPException(status_code=400, detail="Document is empty or unreadable")
 
-        # Add to vector store
-        chunks_count = document_store.add_document(doc_id, file.filename, text)
+        # Add to vector store (chunking + embedding, also blocking)
+        chunks_count = await asyncio.to_thread(
+            document_store.add_document, doc_id, file.filename, text
+        )
 
-        # Store metadata
+        # Store and persist metadata (index append is disk I/O; keep it
+        # off the loop)
         file_type = ext.replace(".", "").upper()
-        _doc_meta[doc_id] = {
-            "filename": file.filename,
-            "filepath": dest,
-            "chunks": chunks_count,
-            "file_type": file_type
-        }
-
-        # Persist metadata
-        meta_path = DATA_DIR / f"{doc_id}.json"
-        meta_path.write_text(json.dumps({
-            "doc_id": doc_id,
-            "filename": file.filename,
-            "chunks_count": chunks_count,
-            "file_type": file_type
-        }))
+        async with _doc_meta_lock:
+            _doc_meta[doc_id] = DocEntry(file.filename, dest, chunks_count, file_type)
+            await asyncio.to_thread(append_meta, {
+                "doc_id": doc_id,
+                "filename": file.filename,
+                "chunks_count": chunks_count,
+                "file_type": file_type
+            })
+        _answer_cache.clear()
 
         return UploadResponse(
             doc_id=doc_id,
@@ -86,6 +218,76 @@ async def upload_file(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/upload-batch", response_model=BatchUploadResponse)
+async def upload_batch(files: List[UploadFile] = File(...)):
+    """Upload several documents at once, indexed as a single embedding batch."""
+    try:
+        # Save and parse every file first. The batch is all-or-nothing: if
+        # any file fails to save, parse, or index, every upload already on
+        # disk is deleted before re-raising so no unregistered orphans
+        # survive outside the metadata registry.
+        parsed = []
+        saved_paths = []
+        try:
+            for file in files:
+                doc_id, dest = await save_upload(file)
+                saved_paths.append(dest)
+                text = await _parse_upload(dest)
+
+                if not text.strip():
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Document is empty or unreadable: {file.filename}"
+                    )
+
+                parsed.append((doc_id, dest, file.filename, text))
+
+            # One batched chunk + embed pass across all documents
+            counts = await asyncio.to_thread(
+                document_store.add_documents,
+                [(doc_id, filename, text) for doc_id, _, filename, text in parsed]
+            )
+        except Exception:
+            for saved in saved_paths:
+                delete_file(saved)
+            raise
+
+        responses = []
+        async with _doc_meta_lock:
+            registered = []
+            for (doc_id, dest, filename, _), chunks_count in zip(parsed, counts):
+                file_type = dest.suffix.replace(".", "").upper()
+                _doc_meta[doc_id] = DocEntry(filename, dest, chunks_count, file_type)
+                registered.append({
+                    "doc_id": doc_id,
+                    "filename": filename,
+                    "chunks_count": chunks_count,
+                    "file_type": file_type
+                })
+            await asyncio.to_thread(append_meta_many, registered)
+
+        for (doc_id, dest, filename, _), chunks_count in zip(parsed, counts):
+            responses.append(UploadResponse(
+                doc_id=doc_id,
+                filename=filename,
+                chunks_count=chunks_count,
+                message=f"Processed {filename} into {chunks_count} chunks"
+            ))
+
+        _answer_cache.clear()
+        total = sum(counts)
+        return BatchUploadResponse(
+            documents=responses,
+            total_chunks=total,
+            message=f"Processed {len(responses)} documents into {total} chunks"
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/text-input", response_model=TextInputResponse)
 async def process_text_input(req: TextInputRequest = Body(...)):
     """Process direct text input."""
@@ -93,26 +295,23 @@ async def process_text_input(req: TextInputRequest = Body(...)):
         if not req.text.strip():
             raise HTTPException(status_code=400, detail="Text cannot be empty")
 
-        doc_id = str(uuid4())
-        chunks_count = document_store.add_document(doc_id, req.title, req.text)
+        doc_id = uuid4().hex
+        chunks_count = await asyncio.to_thread(
+            document_store.add_document, doc_id, req.title, req.text
+        )
         
         if chunks_count == 0:
             raise HTTPException(status_code=400, detail="Text too short to process")
 
-        _doc_meta[doc_id] = {
-            "filename": req.title,
-            "filepath": None,
-            "chunks": chunks_count,
-            "file_type": "TEXT"
-        }
-
-        meta_path = DATA_DIR / f"{doc_id}.json"
-        meta_path.write_text(json.dumps({
-            "doc_id": doc_id,
-            "filename": req.title,
-            "chunks_count": chunks_count,
-            "file_type": "TEXT"
-        }))
+        async with _doc_meta_lock:
+            _doc_meta[doc_id] = DocEntry(req.title, None, chunks_count, "TEXT")
+            await asyncio.to_thread(append_meta, {
+                "doc_id": doc_id,
+                "filename": req.title,
+                "chunks_count": chunks_count,
+                "file_type": "TEXT"
+            })
+        _answer_cache.clear()
 
         return TextInputResponse(
             doc_id=doc_id,
@@ -133,9 +332,17 @@ async def answer_question(req: AnswerRequest = Body(...)):
     if not req.query.strip():
         raise HTTPException(status_code=400, detail="Query cannot be empty")
 
-    # Search for relevant documents
+    cache_key = _answer_cache_key(req)
+    cached = _answer_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # Search for relevant documents (query embedding + ANN lookup are
+    # CPU-bound, so keep them off the event loop)
     doc_ids = req.doc_ids if req.doc_ids else None
-    documents = document_store.search(req.query, top_k=req.top_k, doc_ids=doc_ids)
+    documents = await asyncio.to_thread(
+        document_store.search, req.query, top_k=req.top_k, doc_ids=doc_ids
+    )
     
     if not documents:
         return AnswerResponse(
@@ -149,32 +356,69 @@ async def answer_question(req: AnswerRequest = Body(...)):
     context = format_context(documents)
     
     try:
-        qa_chain = create_qa_chain()
-        answer = qa_chain.invoke({"context": context, "question": req.query})
+        qa_chain = get_qa_chain()
+        answer = await qa_chain.ainvoke({"context": context, "question": req.query})
     except Exception as e:
         raise HTTPException(
             status_code=500, 
             detail=f"LLM error ({settings.LLM_PROVIDER}): {str(e)}"
         )
 
-    # Build source list
-    sources = [
-        SourceDocument(
-            filename=doc.metadata.get("source", "Unknown"),
-            doc_id=doc.metadata.get("doc_id", ""),
-            chunk_index=doc.metadata.get("chunk_index", 0),
-            score=round(doc.metadata.get("score", 0), 4),
-            text=doc.page_content
-        )
-        for doc in documents
-    ]
+    # Build source list, highlighting query terms in each chunk.
+    # model_construct skips re-validation of these server-generated fields.
+    matcher = _compile_query_matcher(req.query)
+    sources = []
+    for doc in documents:
+        metadata = doc.metadata
+        score = metadata.get("score", 0)
+        sources.append(SourceDocument.model_construct(
+            filename=metadata.get("source", "Unknown"),
+            doc_id=metadata.get("doc_id", ""),
+            chunk_index=metadata.get("chunk_index", 0),
+            score=round(score, 4),
+            confidence=_confidence_label(score),
+            text=doc.page_content,
+            highlights=find_query_highlights(_lowered_text(doc), matcher) if matcher else []
+        ))
 
-    return AnswerResponse(
+    response = AnswerResponse.model_construct(
         answer=answer,
         query=req.query,
         sources=sources,
         llm_provider=settings.LLM_PROVIDER
     )
+    _answer_cache[cache_key] = response
+    return response
+
+
+@router.post("/answer/stream")
+async def answer_question_stream(req: AnswerRequest = Body(...)):
+    """Stream an answer token-by-token instead of waiting for the full text."""
+    if not req.query.strip():
+        raise HTTPException(status_code=400, detail="Query cannot be empty")
+
+    doc_ids = req.doc_ids if req.doc_ids else None
+    documents = await asyncio.to_thread(
+        document_store.search, req.query, top_k=req.top_k, doc_ids=doc_ids
+    )
+
+    if not documents:
+        return StreamingResponse(
+            iter(["No relevant information found in the uploaded documents."]),
+            media_type="text/plain"
+        )
+
+    context = format_context(documents)
+    qa_chain = get_qa_chain()
+
+    async def token_stream():
+        try:
+            async for token in qa_chain.astream({"context": context, "question": req.query}):
+                yield token
+        except Exception as e:
+            yield f"\n[LLM error ({settings.LLM_PROVIDER}): {e}]"
+
+    return StreamingResponse(token_stream(), media_type="text/plain")
 
 
 @router.get("/documents", response_model=DocumentListResponse)
@@ -183,9 +427,9 @@ async def list_documents():
     items = [
         DocumentMeta(
             doc_id=doc_id,
-            filename=meta["filename"],
-            chunks=meta["chunks"],
-            file_type=meta["file_type"]
+            filename=meta.filename,
+            chunks=meta.chunks,
+            file_type=meta.file_type
         )
         for doc_id, meta in _doc_meta.items()
     ]
@@ -195,40 +439,37 @@ async def list_documents():
 @router.delete("/documents/{doc_id}")
 async def delete_document(doc_id: str):
     """Delete a document from the knowledge base."""
-    meta = _doc_meta.pop(doc_id, None)
-    if not meta:
-        raise HTTPException(status_code=404, detail="Document not found")
-    
-    # Delete from vector store
-    document_store.delete_document(doc_id)
-    
-    # Delete file if exists
-    if meta.get("filepath"):
-        delete_file(meta["filepath"])
-    
-    # Delete metadata file
-    meta_path = DATA_DIR / f"{doc_id}.json"
-    if meta_path.exists():
-        meta_path.unlink()
-    
+    async with _doc_meta_lock:
+        meta = _doc_meta.pop(doc_id, None)
+        if not meta:
+            raise HTTPException(status_code=404, detail="Document not found")
+
+        # Delete from vector store
+        document_store.delete_document(doc_id)
+
+        # Delete file if exists
+        if meta.filepath:
+            await asyncio.to_thread(delete_file, meta.filepath)
+
+        # Record the deletion in the metadata index
+        await asyncio.to_thread(remove_meta, doc_id)
+    _answer_cache.clear()
+
     return {"message": "Document deleted", "doc_id": doc_id}
 
 
 @router.delete("/documents")
 async def clear_all_documents():
     """Clear all documents from the knowledge base."""
-    count = len(_doc_meta)
-    
-    # Delete all files
-    for doc_id, meta in list(_doc_meta.items()):
-        if meta.get("filepath"):
-            delete_file(meta["filepath"])
-        meta_path = DATA_DIR / f"{doc_id}.json"
-        if meta_path.exists():
-            meta_path.unlink()
-    
-    # Clear vector store and metadata
-    document_store.clear_all()
-    _doc_meta.clear()
+    async with _doc_meta_lock:
+        count = len(_doc_meta)
+
+        # Clear vector store and metadata, then sweep the upload directory
+        # in one scandir pass on a worker thread
+        document_store.clear_all()
+        _doc_meta.clear()
+        await asyncio.to_thread(clear_uploads)
+        await asyncio.to_thread(clear_meta)
+    _answer_cache.clear()
     
     return {"message": f"Cleared {count} documents"}
@@ -20,16 +20,29 @@ class Settings(BaseSettings):
     # Ollama Configuration (local Llama)
     OLLAMA_BASE_URL: str = "http://localhost:11434"
     OLLAMA_MODEL: str = "llama3.2"
+    # Keep the model loaded between requests so the static RAG system
+    # prompt stays in Ollama's prefix cache
+    OLLAMA_KEEP_ALIVE: str = "30m"
     
     # Embedding model (runs locally via sentence-transformers)
     EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
+    EMBED_BATCH_SIZE: int = 64
+
+    # Optional: directory with an ONNX-exported (and optionally INT8
+    # quantized) embedding model; empty string keeps the PyTorch backend
+    ONNX_EMBEDDING_PATH: str = ""
     
     # Text chunking settings
     CHUNK_SIZE: int = 1000
     CHUNK_OVERLAP: int = 200
+
+    # Ingestion settings
+    INGEST_WORKERS: int = 2
+    MAX_UPLOAD_MB: int = 50
     
     # RAG settings
     TOP_K_RESULTS: int = 4
+    MAX_CONTEXT_CHARS: int = 12000
     
     class Config:
         env_file = ".env"
@@ -13,6 +13,12 @@ class UploadResponse(BaseModel):
     message: str = "Document uploaded successfully"
 
 
+class BatchUploadResponse(BaseModel):
+    documents: List[UploadResponse]
+    total_chunks: int
+    message: str = "Batch processed successfully"
+
+
 class TextInputRequest(BaseModel):
     text: str = Field(..., min_length=1)
     title: str = Field(default="Direct Text Input")
@@ -31,12 +37,19 @@ class AnswerRequest(BaseModel):
     doc_ids: Optional[List[str]] = None
 
 
+class HighlightSpan(BaseModel):
+    start: int
+    end: int
+
+
 class SourceDocument(BaseModel):
     filename: str
     doc_id: str
     chunk_index: int
     score: float
+    confidence: str = "low"
     text: str
+    highlights: List[HighlightSpan] = []
 
 
 class AnswerResponse(BaseModel):
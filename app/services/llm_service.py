@@ -28,6 +28,7 @@ def get_llm() -> BaseChatModel:
             model=settings.OLLAMA_MODEL,
             base_url=settings.OLLAMA_BASE_URL,
             temperature=0.3,
+            keep_alive=settings.OLLAMA_KEEP_ALIVE,
         )
     
     else:
@@ -52,17 +53,37 @@ Answer:""")
 ])
 
 
-def create_qa_chain():
-    """Create a simple QA chain for answering questions."""
-    llm = get_llm()
-    return RAG_PROMPT | llm | StrOutputParser()
+# Built chains cached per (provider, model) so config changes still take effect
+_chain_cache = {}
+
+
+def get_qa_chain():
+    """Get the QA chain for the configured provider, building it at most once."""
+    model = settings.GEMINI_MODEL if settings.LLM_PROVIDER == "gemini" else settings.OLLAMA_MODEL
+    key = (settings.LLM_PROVIDER, model)
+    chain = _chain_cache.get(key)
+    if chain is None:
+        chain = _chain_cache[key] = RAG_PROMPT | get_llm() | StrOutputParser()
+    return chain
 
 
 def format_context(documents: list) -> str:
-    """Format retrieved documents into context string."""
+    """
+    Format retrieved documents into a bounded context string.
+
+    The budget is enforced while building: cumulative length is tracked
+    per part instead of truncating the joined string afterwards, so no
+    oversized intermediate string is ever allocated. At least one source
+    is always included.
+    """
     context_parts = []
+    total = 0
     for i, doc in enumerate(documents, 1):
         source = doc.metadata.get("source", "Unknown")
-        context_parts.append(f"[Source {i}: {source}]\n{doc.page_content}")
+        part = f"[Source {i}: {source}]\n{doc.page_content}"
+        total += len(part)
+        if context_parts and total > settings.MAX_CONTEXT_CHARS:
+            break
+        context_parts.append(part)
     return "\n\n---\n\n".join(context_parts)
 
@@ -0,0 +1,73 @@
+"""
+ONNX Runtime Embeddings - quantized local embedding inference
+"""
+
+from pathlib import Path
+from typing import List
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from app.core.config import settings
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Embeddings served from an ONNX Runtime session.
+
+    Expects a sentence-transformers model exported to ONNX (and ideally
+    INT8-quantized), e.g.:
+
+        optimum-cli export onnx -m sentence-transformers/all-MiniLM-L6-v2 model_dir/
+        optimum-cli onnxruntime quantize --onnx_model model_dir/ --avx512 -o model_dir/
+
+    On CPU the quantized model typically embeds 2-4x faster than the
+    PyTorch baseline at roughly a quarter of the memory footprint.
+    """
+
+    def __init__(self, model_path: str):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+
+        # Run the full graph-optimization pipeline once at load and keep
+        # memory patterns enabled so weight pages stay read-only and are
+        # shared across forked worker processes instead of copied
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.enable_mem_pattern = True
+
+        # optimum-cli's quantizer writes model_quantized.onnx alongside the
+        # plain export; prefer it when present so following the recipe above
+        # actually serves the INT8 model
+        model_file = Path(model_path) / "model_quantized.onnx"
+        if not model_file.exists():
+            model_file = Path(model_path) / "model.onnx"
+        self.session = ort.InferenceSession(
+            str(model_file),
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """Tokenize, run the session, mean-pool, and L2-normalize."""
+        encoded = self.tokenizer(
+            texts, padding=True, truncation=True, max_length=512, return_tensors="np"
+        )
+        inputs = {k: v for k, v in encoded.items() if k in self._input_names}
+        hidden = self.session.run(None, inputs)[0]
+
+        mask = encoded["attention_mask"][..., None].astype(hidden.dtype)
+        pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return pooled / np.maximum(norms, 1e-9)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        batch = settings.EMBED_BATCH_SIZE
+        vectors = []
+        for i in range(0, len(texts), batch):
+            vectors.extend(self._encode(texts[i:i + batch]).tolist())
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text])[0].tolist()
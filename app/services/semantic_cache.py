@@ -0,0 +1,60 @@
+"""
+Semantic Query Cache - reuses retrieval results for near-identical queries
+"""
+
+from typing import List, Optional
+import threading
+import numpy as np
+
+
+class SemanticCache:
+    """
+    Bounded cache keyed by normalized query embeddings.
+
+    The caller supplies the already-computed query vector, so a lookup
+    costs one matrix-vector product over the cached vectors — embeddings
+    are L2-normalized, making cosine similarity a plain dot product. Any
+    entry clearing the similarity threshold with a matching filter key is
+    a hit. Entries are evicted oldest-first once the bound is reached.
+
+    Exact random-projection LSH is unnecessary at this size: a dense dot
+    against a few hundred rows is a handful of microseconds.
+    """
+
+    def __init__(self, max_entries: int = 256, threshold: float = 0.95):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self._vectors: Optional[np.ndarray] = None
+        self._entries: List[tuple] = []  # (filter_key, results), row-aligned
+        self._lock = threading.Lock()
+
+    def get(self, vector: np.ndarray, filter_key) -> Optional[list]:
+        """Return cached results for a similar-enough query, or None."""
+        with self._lock:
+            if self._vectors is None:
+                return None
+            sims = self._vectors @ vector
+            hits = np.nonzero(sims >= self.threshold)[0]
+            for i in hits[np.argsort(-sims[hits])]:
+                if self._entries[i][0] == filter_key:
+                    return self._entries[i][1]
+        return None
+
+    def add(self, vector: np.ndarray, filter_key, results: list):
+        """Store results under the query vector and its filter key."""
+        row = vector.reshape(1, -1).astype(np.float32)
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = row
+            else:
+                if len(self._entries) >= self.max_entries:
+                    self._vectors = self._vectors[1:]
+                    self._entries.pop(0)
+                self._vectors = np.vstack((self._vectors, row))
+            self._entries.append((filter_key, results))
+
+    def clear(self):
+        """Drop all cached entries."""
+        with self._lock:
+            self._vectors = None
+            self._entries.clear()
@@ -4,13 +4,16 @@ Vector Store - ChromaDB with Sentence Transformer Embeddings
 
 from typing import List, Optional
 from pathlib import Path
+import bisect
+import re
+import numpy as np
 import chromadb
 from chromadb.config import Settings as ChromaSettings
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import Chroma
 from langchain_core.documents import Document
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from app.core.config import settings, CHROMA_DIR
+from app.services.semantic_cache import SemanticCache
 
 
 # Initialize embedding model (runs locally)
@@ -20,20 +23,64 @@ def get_embeddings():
     """Get or initialize the embedding model."""
     global _embeddings
     if _embeddings is None:
+        if settings.ONNX_EMBEDDING_PATH:
+            from app.services.onnx_embeddings import OnnxEmbeddings
+            _embeddings = OnnxEmbeddings(settings.ONNX_EMBEDDING_PATH)
+            return _embeddings
         _embeddings = HuggingFaceEmbeddings(
             model_name=settings.EMBEDDING_MODEL,
             model_kwargs={"device": "cpu"},
-            encode_kwargs={"normalize_embeddings": True}
+            encode_kwargs={
+                "batch_size": settings.EMBED_BATCH_SIZE,
+                "normalize_embeddings": True
+            }
         )
     return _embeddings
 
 
-# Text splitter for chunking documents
-text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size=settings.CHUNK_SIZE,
-    chunk_overlap=settings.CHUNK_OVERLAP,
-    separators=["\n\n", "\n", ". ", " ", ""]
-)
+# Split points for chunking, matching the separator preference order the
+# RecursiveCharacterTextSplitter was configured with
+_SPLIT_RE = re.compile(r"\n\n|\n|\. | ")
+
+
+def fast_split(text: str, chunk_size: int, chunk_overlap: int) -> List[str]:
+    """
+    Greedy single-pass chunker over precompiled separator matches.
+
+    Replaces RecursiveCharacterTextSplitter for the fixed separator set
+    ("\\n\\n", "\\n", ". ", " "): all split points are found in one C-level
+    regex pass, chunks are packed up to chunk_size at the latest split
+    point that fits (hard-splitting separator-free runs), and each new
+    chunk restarts chunk_overlap characters back, aligned to a split.
+    """
+    n = len(text)
+    if n <= chunk_size:
+        stripped = text.strip()
+        return [stripped] if stripped else []
+
+    cuts = [m.end() for m in _SPLIT_RE.finditer(text)]
+    cuts.append(n)
+
+    chunks = []
+    start = 0
+    while start < n:
+        limit = start + chunk_size
+        if limit >= n:
+            end = n
+        else:
+            # Latest cut that still fits, or a hard split when none does
+            j = bisect.bisect_right(cuts, limit) - 1
+            end = cuts[j] if j >= 0 and cuts[j] > start else limit
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= n:
+            break
+        # Restart chunk_overlap back, aligned forward to a split point
+        j = bisect.bisect_left(cuts, end - chunk_overlap)
+        next_start = cuts[j] if j < len(cuts) else end
+        start = next_start if start < next_start < end else end
+    return chunks
 
 
 class DocumentStore:
@@ -46,7 +93,15 @@ class DocumentStore:
             settings=ChromaSettings(anonymized_telemetry=False)
         )
         self._vectorstore = None
-    
+        self._collection = None
+        self._query_cache = SemanticCache()
+
+    def _get_collection(self):
+        """Get the raw Chroma collection, caching the handle."""
+        if self._collection is None:
+            self._collection = self.client.get_collection("documents")
+        return self._collection
+
     @property
     def vectorstore(self) -> Optional[Chroma]:
         """Get or create the vector store."""
@@ -61,32 +116,48 @@ class DocumentStore:
     def add_document(self, doc_id: str, filename: str, text: str) -> int:
         """
         Add a document to the vector store.
-        
+
         Returns the number of chunks created.
         """
-        # Split text into chunks
-        chunks = text_splitter.split_text(text)
-        
-        if not chunks:
-            return 0
-        
-        # Create LangChain documents with metadata
-        documents = [
-            Document(
-                page_content=chunk,
-                metadata={
-                    "doc_id": doc_id,
-                    "source": filename,
-                    "chunk_index": i
-                }
+        return self.add_documents([(doc_id, filename, text)])[0]
+
+    def add_documents(self, items: List[tuple]) -> List[int]:
+        """
+        Add several documents to the vector store in one batch.
+
+        Each item is a (doc_id, filename, text) tuple. Chunks from all
+        documents are embedded in a single vector store call, amortizing
+        per-call model overhead across the batch.
+
+        Returns the number of chunks created per item, in order.
+        """
+        documents = []
+        counts = []
+        for doc_id, filename, text in items:
+            chunks = fast_split(text, settings.CHUNK_SIZE, settings.CHUNK_OVERLAP)
+            counts.append(len(chunks))
+            documents.extend(
+                Document(
+                    page_content=chunk,
+                    metadata={
+                        "doc_id": doc_id,
+                        "source": filename,
+                        "chunk_index": i
+                    }
+                )
+                for i, chunk in enumerate(chunks)
             )
-            for i, chunk in enumerate(chunks)
-        ]
-        
-        # Add to vector store
-        self.vectorstore.add_documents(documents)
-        
-        return len(chunks)
+
+        if documents:
+            # Sort by text length (a cheap token-count proxy) so each
+            # embedding batch pads to similar sequence lengths instead of
+            # one long chunk inflating a batch of short ones. Insertion
+            # order is irrelevant — chunk_index lives in the metadata.
+            documents.sort(key=lambda doc: len(doc.page_content))
+            self.vectorstore.add_documents(documents)
+            self._query_cache.clear()
+
+        return counts
     
     def search(self, query: str, top_k: int = None, doc_ids: List[str] = None) -> List[Document]:
         """
@@ -98,32 +169,52 @@ class DocumentStore:
             doc_ids: Optional filter to specific documents
         """
         k = top_k or settings.TOP_K_RESULTS
-        
-        # Build filter if doc_ids specified
+
+        # Embed the query once; vectors are normalized, so the semantic
+        # cache can compare by dot product and a near-identical query
+        # skips Chroma entirely
+        query_vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        filter_key = (k, tuple(sorted(doc_ids)) if doc_ids else None)
+        cached = self._query_cache.get(query_vector, filter_key)
+        if cached is not None:
+            return cached
+
+        # Build filter if doc_ids specified (plain equality for a single doc
+        # is cheaper for Chroma to evaluate than an $in list)
         where_filter = None
         if doc_ids:
-            where_filter = {"doc_id": {"$in": doc_ids}}
-        
-        results = self.vectorstore.similarity_search_with_relevance_scores(
-            query, k=k, filter=where_filter
+            if len(doc_ids) == 1:
+                where_filter = {"doc_id": doc_ids[0]}
+            else:
+                where_filter = {"doc_id": {"$in": doc_ids}}
+
+        results = self.vectorstore.similarity_search_by_vector_with_relevance_scores(
+            query_vector.tolist(), k=k, filter=where_filter
         )
-        
+
+        # The by-vector method returns raw Chroma distances (lower = more
+        # similar); map them through the store's relevance function so
+        # scores keep the baseline contract of higher = more relevant, ~0-1
+        relevance_fn = self.vectorstore._select_relevance_score_fn()
+
         # Add score to metadata
         documents = []
         for doc, score in results:
-            doc.metadata["score"] = score
+            doc.metadata["score"] = relevance_fn(score)
             documents.append(doc)
-        
+
+        self._query_cache.add(query_vector, filter_key, documents)
         return documents
     
     def delete_document(self, doc_id: str):
         """Delete all chunks for a document."""
         try:
-            collection = self.client.get_collection("documents")
+            collection = self._get_collection()
             # Get IDs of chunks belonging to this document
             results = collection.get(where={"doc_id": doc_id})
             if results["ids"]:
                 collection.delete(ids=results["ids"])
+            self._query_cache.clear()
         except Exception:
             pass
     
@@ -132,14 +223,15 @@ class DocumentStore:
         try:
             self.client.delete_collection("documents")
             self._vectorstore = None
+            self._collection = None
+            self._query_cache.clear()
         except Exception:
             pass
     
     def get_document_count(self) -> int:
         """Get total number of chunks in the store."""
         try:
-            collection = self.client.get_collection("documents")
-            return collection.count()
+            return self._get_collection().count()
         except Exception:
             return 0
 
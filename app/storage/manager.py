@@ -4,34 +4,94 @@ File Storage Management
 
 from fastapi import UploadFile, HTTPException
 from pathlib import Path
-import shutil
+import aiofiles
+import asyncio
+import orjson
+import os
 from uuid import uuid4
-from app.core.config import UPLOAD_DIR
+from app.core.config import settings, UPLOAD_DIR, DATA_DIR
 
 ALLOWED_EXTENSIONS = [".pdf", ".docx", ".txt"]
 
+# Read uploads in 1 MB chunks so memory stays flat for large files
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
-def save_upload(file: UploadFile) -> tuple[str, Path]:
-    """Save uploaded file and return (doc_id, file_path)."""
+# Append-only document metadata index (one JSON record per line)
+META_INDEX = DATA_DIR / "documents.jsonl"
+
+
+def _sendfile_copy(src_fd: int, dest: Path):
+    """Kernel-to-kernel copy of an upload that has spilled to a real file."""
+    size = os.fstat(src_fd).st_size
+    with dest.open("wb") as out:
+        offset = 0
+        while offset < size:
+            sent = os.sendfile(out.fileno(), src_fd, offset, size - offset)
+            if sent == 0:
+                break
+            offset += sent
+
+
+async def save_upload(file: UploadFile) -> tuple[str, Path]:
+    """Stream an uploaded file to disk and return (doc_id, file_path)."""
     if not file.filename:
         raise HTTPException(status_code=400, detail="File must have a filename")
-    
-    ext = Path(file.filename).suffix.lower()
+
+    # splitext on the raw string avoids a throwaway Path allocation
+    ext = os.path.splitext(file.filename)[1].lower()
     if ext not in ALLOWED_EXTENSIONS:
         raise HTTPException(status_code=400, detail=f"Supported formats: {', '.join(ALLOWED_EXTENSIONS)}")
-    
-    doc_id = str(uuid4())
+
+    # Reject oversized uploads before spending any disk or parse time
+    max_bytes = settings.MAX_UPLOAD_MB * 1024 * 1024
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File exceeds the {settings.MAX_UPLOAD_MB} MB upload limit"
+        )
+
+    doc_id = uuid4().hex
     dest = UPLOAD_DIR / f"{doc_id}{ext}"
-    
+
     try:
-        with dest.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # Large uploads spill from Starlette's spool to a real temp file;
+        # copy those kernel-to-kernel with sendfile instead of shuttling
+        # 1 MB chunks through Python
+        spooled = file.file
+        if hasattr(os, "sendfile") and getattr(spooled, "_rolled", False):
+            await asyncio.to_thread(_sendfile_copy, spooled.fileno(), dest)
+        else:
+            async with aiofiles.open(dest, "wb") as buffer:
+                while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                    await buffer.write(chunk)
     finally:
-        file.file.close()
-    
+        await file.close()
+
     return doc_id, dest
 
 
+def append_meta(record: dict):
+    """Append a metadata record to the document index."""
+    with META_INDEX.open("ab") as f:
+        f.write(orjson.dumps(record) + b"\n")
+
+
+def append_meta_many(records: list):
+    """Append several metadata records in one index write."""
+    with META_INDEX.open("ab") as f:
+        f.write(b"".join(orjson.dumps(r) + b"\n" for r in records))
+
+
+def remove_meta(doc_id: str):
+    """Record a document deletion as a tombstone in the index."""
+    append_meta({"doc_id": doc_id, "deleted": True})
+
+
+def clear_meta():
+    """Reset the document index."""
+    META_INDEX.unlink(missing_ok=True)
+
+
 def delete_file(path: Path):
     """Delete a file if it exists."""
     try:
@@ -39,3 +99,13 @@ def delete_file(path: Path):
             path.unlink()
     except Exception:
         pass
+
+
+def clear_uploads():
+    """Delete every stored upload in a single directory pass."""
+    with os.scandir(UPLOAD_DIR) as entries:
+        for entry in entries:
+            try:
+                os.unlink(entry.path)
+            except OSError:
+                pass